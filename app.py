@@ -1,37 +1,118 @@
+import io
 import streamlit as st
 import yfinance as yf
+from curl_cffi import requests as curl_requests
 import pandas as pd
+import numpy as np
 import plotly.graph_objects as go
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+from datetime import date, datetime, timedelta
 
-# Function to fetch stock or index data and
+# Page configuration, kept as the first Streamlit call in the script
 st.set_page_config(layout="wide", page_title="Data Viewer", page_icon=':bar_chart:')
 
-def fetch_stock_data(ticker, start_date, end_date):
-    stock = yf.Ticker(ticker)
+# One HTTP session shared by every Yahoo Finance call in this server process, so the
+# TCP and TLS connections are reused across requests, reruns and user sessions
+@st.cache_resource
+def get_session():
+    return curl_requests.Session(impersonate="chrome")
+
+# Cached Yahoo Finance calls: Streamlit reruns the whole script on every widget
+# interaction, so repeat lookups are served from memory instead of the network
+@st.cache_data(ttl=3600, show_spinner=False)
+def _fetch_history(ticker, start_date, end_date):
+    stock = yf.Ticker(ticker, session=get_session())
+    # Use actions=True to ensure adjusted close is included in the data
+    stock_data = stock.history(period="1d", start=start_date, end=end_date, actions=True)
+    # Raise rather than return an empty frame, so a failed lookup is not cached and gets retried
+    if stock_data.empty:
+        raise ValueError(f"No data returned for {ticker}. Please check the ticker symbol.")
+    # Drop the timezone once here so every later consumer works with a naive DatetimeIndex
+    stock_data.index = stock_data.index.tz_localize(None)
+    return stock_data
+
+# Batched history for a watchlist: one yf.download call fetches every symbol on yfinance's
+# own thread pool instead of a serial loop of Ticker.history calls
+@st.cache_data(ttl=3600, show_spinner=False)
+def _fetch_history_batch(tickers, start_date, end_date):
+    stock_data = yf.download(list(tickers), start=start_date, end=end_date, actions=True, group_by='ticker',
+                             threads=True, ignore_tz=True, progress=False, session=get_session())
+    # Split the (ticker, field) columns into one frame per symbol; failed symbols come back all-NaN
+    return {ticker: stock_data[ticker].dropna(how='all') for ticker in tickers}
+
+# Company info changes slowly, so it is kept around longer than the price history
+@st.cache_data(ttl=86400, show_spinner=False)
+def _fetch_info(ticker):
+    return yf.Ticker(ticker, session=get_session()).info
+
+# fast_info reads the price from the lightweight chart endpoint instead of the full info blob
+@st.cache_data(ttl=300, show_spinner=False)
+def _fetch_last_price(ticker):
+    return yf.Ticker(ticker, session=get_session()).fast_info.get('last_price', 'N/A')
+
+# Function to fetch the current price, falling back to a placeholder if the request fails.
+# Called on every run so the five minute cache above decides how fresh the price is.
+def fetch_last_price(ticker):
+    try:
+        return _fetch_last_price(ticker)
+    except Exception:
+        return 'N/A'
 
+def fetch_stock_data(ticker, start_date, end_date):
     # Try to fetch stock history data
     try:
-        # Use actions=True to ensure adjusted close is included in the data
-        stock_data = stock.history(period="1d", start=start_date, end=end_date, actions=True)
-        if stock_data.empty:
-            raise ValueError(f"No data returned for {ticker}. Please check the ticker symbol.")
+        stock_data = _fetch_history(ticker, start_date, end_date)
     except Exception as e:
         st.error(f"Error fetching data for {ticker}: {str(e)}")
-        return None, None, None, None
+        return None, None
 
-    # Fetch company or index info
-    info = stock.info
-    company_name = info.get('longName', 'N/A')
-    company_desc = info.get('longBusinessSummary', 'No description available')
+    # Ensure that 'Adj Close' is available, otherwise fallback to 'Close'
+    if 'Adj Close' not in stock_data.columns:
+        stock_data['Adj Close'] = stock_data['Close']  # Fallback to using Close if Adj Close is missing
 
     # Get the first available date for start_date
-    first_available_date = stock_data.index.min().tz_localize(None)
+    first_available_date = stock_data.index.min()
+
+    return stock_data, first_available_date
 
-    # Get current bid price
-    bid_price = info.get('bid', 'N/A')
+# Function to fetch data for several tickers at once, returning the same
+# (stock_data, first_available_date) tuple as fetch_stock_data per ticker
+def fetch_watchlist_data(tickers, start_date, end_date):
+    try:
+        histories = _fetch_history_batch(tuple(tickers), start_date, end_date)
+    except Exception as e:
+        st.error(f"Error fetching data for {', '.join(tickers)}: {str(e)}")
+        return {}
+
+    watchlist = {}
+    for ticker in tickers:
+        stock_data = histories[ticker]
+        if stock_data.empty:
+            # Retry a symbol missing from the batch on its own; failed single lookups are not cached
+            stock_data, first_available_date = fetch_stock_data(ticker, start_date, end_date)
+            if stock_data is not None:
+                watchlist[ticker] = (stock_data, first_available_date)
+            continue
+
+        # Ensure that 'Adj Close' is available, otherwise fallback to 'Close'
+        if 'Adj Close' not in stock_data.columns:
+            stock_data['Adj Close'] = stock_data['Close']  # Fallback to using Close if Adj Close is missing
+
+        watchlist[ticker] = (stock_data, stock_data.index.min())
+
+    return watchlist
+
+# Function to fetch company or index info, only called once the user asks for the details
+def fetch_company_info(ticker):
+    try:
+        info = _fetch_info(ticker)
+    except Exception:
+        info = {}
+    company_name = info.get('longName', 'N/A')
+    company_desc = info.get('longBusinessSummary', 'No description available')
+    return company_name, company_desc
 
-    return stock_data, company_name, company_desc, first_available_date, bid_price
 # Function to prepare data for Excel export
 def prepare_for_export(stock_data, ticker, start_date, end_date):
     # Create a new Excel file with the ticker and date range as the sheet name
@@ -40,154 +121,212 @@ def prepare_for_export(stock_data, ticker, start_date, end_date):
     # Clean the filename to remove special characters that may be problematic
     filename = filename.replace(":", "_").replace("^", "_")  # Replace any invalid characters
 
-    # Optionally, specify a directory where you know you have permission to write files:
-    # filename = f"C:/Users/{your_username}/Documents/{filename}"
-
-    # Convert stock data to DataFrame
-    stock_data['Date'] = stock_data.index.tz_localize(None)  # Remove timezone information
-    stock_data.reset_index(drop=True, inplace=True)
+    # Format Date to Month Day, Year here rather than on every rerun, since only the export needs it
+    formatted_dates = stock_data.index.strftime('%b %d, %Y')
+    stock_data = stock_data.reset_index(drop=True)
+    stock_data.insert(0, 'Date', formatted_dates)
 
-    # Save data to Excel
-    with pd.ExcelWriter(filename, engine='openpyxl') as writer:
+    # Build the workbook in memory so nothing touches the server's filesystem
+    buffer = io.BytesIO()
+    with pd.ExcelWriter(buffer, engine='xlsxwriter') as writer:
         stock_data.to_excel(writer, index=False, sheet_name=ticker)
 
-    return filename
-
-# Function to calculate performance over various time periods
-def calculate_performance(stock_data):
+    return buffer.getvalue(), filename
+
+# Trading-day offsets for the fixed performance windows
+PERFORMANCE_PERIODS = {
+    "1D": 1,
+    "1M": 30,
+    "1Y": 252,  # Approx 252 trading days in a year
+    "3Y": 252*3,
+    "5Y": 252*5,
+    "10Y": 252*10,
+}
+
+# Percentage change between the last close and the close each period earlier, computed
+# for all periods in one vectorized pass; periods longer than the history give NaN
+def perf_kernel(close, periods):
+    out = np.full(len(periods), np.nan)
+    valid = periods < len(close)
+    out[valid] = (close[-1] / close[-1 - periods[valid]] - 1) * 100
+    return out
+
+# Function to calculate performance over various time periods, cached across reruns.
+# Takes the Adj Close values and their datetime64 dates as plain NumPy arrays, which
+# st.cache_data hashes directly without going through pandas.
+@st.cache_data(ttl=3600, show_spinner=False)
+def calculate_performance(close, dates):
     # Calculate the percentage change for each period: 1D, 1M, 1Y, 3Y, 5Y, 10Y, YTD
-    performance = {}
-
-    # Ensure that 'Adj Close' is available, otherwise fallback to 'Close'
-    if 'Adj Close' not in stock_data.columns:
-        stock_data['Adj Close'] = stock_data['Close']  # Fallback to using Close if Adj Close is missing
-
-    # 1D performance
-    performance["1D"] = (stock_data['Adj Close'].pct_change(periods=1).iloc[-1]) * 100
-
-    # 1M performance
-    performance["1M"] = (stock_data['Adj Close'].pct_change(periods=30).iloc[-1]) * 100
-
-    # 1Y performance
-    performance["1Y"] = (stock_data['Adj Close'].pct_change(periods=252).iloc[-1]) * 100  # Approx 252 trading days in a year
-
-    # 3Y performance
-    performance["3Y"] = (stock_data['Adj Close'].pct_change(periods=252*3).iloc[-1]) * 100
-
-    # 5Y performance
-    performance["5Y"] = (stock_data['Adj Close'].pct_change(periods=252*5).iloc[-1]) * 100
-
-    # 10Y performance
-    performance["10Y"] = (stock_data['Adj Close'].pct_change(periods=252*10).iloc[-1]) * 100
+    changes = perf_kernel(close, np.array(list(PERFORMANCE_PERIODS.values())))
+    performance = dict(zip(PERFORMANCE_PERIODS, changes))
 
     # YTD (Year-to-Date) performance
-    start_of_year = stock_data[stock_data.index.month == 1].iloc[0]  # Get first data point of the year
-    performance["YTD"] = ((stock_data['Adj Close'].iloc[-1] - start_of_year['Adj Close']) / start_of_year['Adj Close']) * 100
+    year = pd.Timestamp(dates[-1]).year
+    start_of_year = np.searchsorted(dates, np.datetime64(f'{year}-01-01'))  # Binary search for the first data point of the year
+    performance["YTD"] = (close[-1] / close[start_of_year] - 1) * 100
 
     return performance
 
+# Function to build the monthly Plotly Line Graph, cached as a plain figure dict so reruns
+# that leave the chart data unchanged skip building and laying out the figure again
+@st.cache_data(ttl=3600, show_spinner=False)
+def build_monthly_figure(ticker, dates, monthly_close):
+    fig = go.Figure(data=[go.Scatter(x=dates,
+                                    y=monthly_close,
+                                    mode='lines',  # Line graph mode
+                                    name='Adj Close',  # Label for the line
+                                    line=dict(color='blue'))])  # Customize line color
+
+    fig.update_layout(title=f"{ticker} Monthly Performance", xaxis_title="Date", yaxis_title="Price")
+
+    # Update x-axis format for better visibility
+    fig.update_xaxes(tickformat='%b %d, %Y')
+
+    return fig.to_dict()
+
+# Function to display price, performance, chart, table and export controls for one ticker
+def display_ticker(ticker, stock_data, last_price, start_date, end_date):
+    # Display the latest price; the slower company info is only fetched on request
+    price_text = f"{last_price:,.2f}" if isinstance(last_price, (int, float)) else last_price
+    st.subheader(f"{ticker} - ${price_text}")
+    if st.toggle("Show company details", key=f"details_{ticker}"):
+        company_name, company_desc = fetch_company_info(ticker)
+        st.subheader(f"Name: {company_name}")
+        st.write(company_desc)
+
+    # Narrow the full history to the selected date range locally instead of downloading it again
+    stock_data_filtered = stock_data.loc[str(start_date):str(end_date)]
+
+    if stock_data_filtered.empty:
+        st.warning(f"No data available for {ticker} between {start_date} and {end_date}.")
+        return
+
+    # Materialize the Adj Close values once and reuse them for every calculation below
+    close = stock_data_filtered['Adj Close'].to_numpy(dtype=np.float64, copy=False)
+
+    # Calculate performance for different periods
+    performance = calculate_performance(close, stock_data_filtered.index.to_numpy())
+    col1, col2, col3, col4, col5, col6, col7 = st.columns(7)
+    # Display performance at the top
+    st.subheader(f"{ticker} Performance")
+    with col1:
+        st.write(f"1D: {performance['1D']:.2f}%")
+    with col2:
+        st.write(f"1M: {performance['1M']:.2f}%")
+    with col3:
+        st.write(f"1Y: {performance['1Y']:.2f}%")
+    with col4:
+        st.write(f"3Y: {performance['3Y']:.2f}%")
+    with col5:
+        st.write(f"5Y: {performance['5Y']:.2f}%")
+    with col6:
+        st.write(f"10Y: {performance['10Y']:.2f}%")
+    with col7:
+        st.write(f"YTD: {performance['YTD']:.2f}%")  # YTD Performance
+
+    # Resample to Monthly data and get the last day of the month
+    st.subheader("Monthly Performance")
+    # Group by (year, month) and keep the last data point of each month; unlike resample this
+    # builds no bin range and skips months without data instead of emitting NaN rows
+    filtered_index = stock_data_filtered.index
+    stock_data_monthly = stock_data_filtered.groupby([filtered_index.year, filtered_index.month]).last()
+    stock_data_monthly.index = pd.DatetimeIndex(pd.to_datetime({
+        'year': stock_data_monthly.index.get_level_values(0),
+        'month': stock_data_monthly.index.get_level_values(1),
+        'day': 1,
+    }) + pd.offsets.MonthEnd(0), name=filtered_index.name)  # Label each row with its month end, as resample('ME') did
+
+    # Calculate Percentage Change Month over Month into a preallocated array
+    monthly_close = stock_data_monthly['Adj Close'].to_numpy(dtype=np.float64, copy=False)
+    monthly_change = np.empty_like(monthly_close)
+    monthly_change[0] = np.nan
+    np.divide(np.diff(monthly_close), monthly_close[:-1], out=monthly_change[1:])
+    stock_data_monthly['% Change'] = monthly_change * 100
+
+    # Create Plotly Line Graph
+    st.plotly_chart(build_monthly_figure(ticker, stock_data_monthly.index.to_numpy(), monthly_close),
+                    key=f"chart_{ticker}")
+
+    # Display Data Table with only Adjusted Close and % Change
+    st.subheader("Stock Data Table")
+    st.dataframe(stock_data_monthly[['Adj Close', '% Change']])
+
+    # Initialize excel_bytes as None
+    with st.sidebar:
+        # Export Data to Excel
+        st.subheader(f"Export {ticker} Data to Excel")
+
+        excel_bytes = None
+
+        if st.button("Export to Excel", key=f"export_{ticker}"):
+            # Generate Excel file when button is clicked
+            excel_bytes, excel_filename = prepare_for_export(
+                stock_data_monthly[['Adj Close', '% Change']], ticker, start_date, end_date)
+            st.success(f"File Created successfully!")
+
+        # If the workbook is generated, provide download link
+        if excel_bytes:
+            st.download_button(
+                label="Download Excel File",
+                data=excel_bytes,
+                file_name=excel_filename,
+                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                key=f"download_{ticker}"
+            )
+
 # Streamlit UI
 st.title("Stock and Index Data Viewer")
 
 with st.sidebar:
     st.title("Settings")
-    # Input for ticker symbol
-    ticker = st.text_input("Enter Stock or Index Ticker Symbol", "")
+    # Input for ticker symbols; several can be separated by spaces or commas
+    ticker = st.text_input("Enter Stock or Index Ticker Symbols", "")
 
 # Initialize start_date and end_date as None
 start_date = None
 end_date = None
 
-# Fetch data when ticker is entered
-if ticker:
+# Drop repeated symbols, keeping the order they were entered in
+tickers = list(dict.fromkeys(ticker.upper().replace(",", " ").split()))
 
-    # Fetch data from Yahoo Finance
-    stock_data, company_name, company_desc, first_available_date, bid_price = fetch_stock_data(ticker, "2000-01-01", datetime.today())
+# Fetch data when ticker is entered
+if tickers:
+
+    # End is exclusive; a date rather than a timestamp keeps the cache key stable
+    fetch_end = date.today() + timedelta(days=1)
+
+    # Latest prices are fetched on every run, concurrently with the history below.
+    # Worker threads get the script context so st.cache_data works inside them.
+    with ThreadPoolExecutor(max_workers=min(len(tickers), 8), initializer=add_script_run_ctx,
+                            initargs=(None, get_script_run_ctx())) as executor:
+        price_futures = {ticker: executor.submit(fetch_last_price, ticker) for ticker in tickers}
+
+        # Reuse the history from the previous run while the tickers are unchanged, so date changes never touch the network.
+        # Symbols that failed stay missing until the input changes, when they are requested again.
+        data_key = (tuple(tickers), fetch_end)
+        if st.session_state.get('data', (None,))[0] == data_key:
+            _, watchlist = st.session_state['data']
+            for ticker in tickers:
+                if ticker not in watchlist:
+                    st.error(f"Error fetching data for {ticker}: No data returned for {ticker}. Please check the ticker symbol.")
+        else:
+            # Fetch data from Yahoo Finance; several tickers go through one batched download
+            if len(tickers) == 1:
+                stock_data, first_available_date = fetch_stock_data(tickers[0], "2000-01-01", fetch_end)
+                watchlist = {tickers[0]: (stock_data, first_available_date)} if stock_data is not None else {}
+            else:
+                watchlist = fetch_watchlist_data(tickers, "2000-01-01", fetch_end)
+            st.session_state['data'] = (data_key, watchlist)
+
+    last_prices = {ticker: future.result() for ticker, future in price_futures.items()}
+
+    if watchlist:
+        first_available_date = min(first_date for _, first_date in watchlist.values())
 
-    if stock_data is not None:
         # Set start_date to the first available month
         with st.sidebar:
             start_date = st.date_input("Start Date", first_available_date, min_value=None, max_value=datetime.today())
             end_date = st.date_input("End Date", datetime.today(), min_value=start_date, max_value=datetime.today())
 
-        # Display company or index info
-        st.subheader(f"Name: {company_name} - ${bid_price}")
-        st.write(company_desc)
-
-        # Fetch the stock data again based on the selected date range
-        stock_data_filtered, _, _, _, _ = fetch_stock_data(ticker, start_date, end_date)
-
-        if stock_data_filtered is not None:
-            # Calculate performance for different periods
-            performance = calculate_performance(stock_data_filtered)
-            col1, col2, col3, col4, col5, col6, col7 = st.columns(7)
-            # Display performance at the top
-            st.subheader(f"{company_name} Performance")
-            with col1:
-                st.write(f"1D: {performance['1D']:.2f}%")
-            with col2:
-                st.write(f"1M: {performance['1M']:.2f}%")
-            with col3:
-                st.write(f"1Y: {performance['1Y']:.2f}%")
-            with col4:
-                st.write(f"3Y: {performance['3Y']:.2f}%")
-            with col5:
-                st.write(f"5Y: {performance['5Y']:.2f}%")
-            with col6:
-                st.write(f"10Y: {performance['10Y']:.2f}%")
-            with col7:
-                st.write(f"YTD: {performance['YTD']:.2f}%")  # YTD Performance
-
-            # Ensure the index is set to datetime
-            stock_data_filtered.index = pd.to_datetime(stock_data_filtered.index)
-
-            # Resample to Monthly data and get the last day of the month
-            st.subheader("Monthly Performance")
-            stock_data_monthly = stock_data_filtered.resample('ME').last()  # Resample to monthly data (last data point of each month)
-
-            # Calculate Percentage Change Month over Month
-            stock_data_monthly['% Change'] = stock_data_monthly['Adj Close'].pct_change() * 100
-
-            # Format Date to Month Day, Year
-            stock_data_monthly['Formatted Date'] = stock_data_monthly.index.strftime('%b %d, %Y')
-
-            # Create Plotly Line Graph
-            fig = go.Figure(data=[go.Scatter(x=stock_data_monthly.index,
-                                            y=stock_data_monthly['Adj Close'],
-                                            mode='lines',  # Line graph mode
-                                            name='Adj Close',  # Label for the line
-                                            line=dict(color='blue'))])  # Customize line color
-
-            fig.update_layout(title=f"{ticker} Monthly Performance", xaxis_title="Date", yaxis_title="Price")
-
-            # Update x-axis format for better visibility
-            fig.update_xaxes(tickformat='%b %d, %Y')
-
-            st.plotly_chart(fig)
-
-            # Display Data Table with only Adjusted Close and % Change
-            st.subheader("Stock Data Table")
-            st.dataframe(stock_data_monthly[['Adj Close', '% Change']])
-
-            # Initialize excel_filename as None
-            with st.sidebar:
-                # Export Data to Excel
-                st.subheader("Export Data to Excel")
-
-                excel_filename = None
-
-                if st.button("Export to Excel"):
-                    # Generate Excel file when button is clicked
-                    excel_filename = prepare_for_export(
-                        stock_data_monthly[['Formatted Date', 'Adj Close', '% Change']], ticker, start_date, end_date)
-                    st.success(f"File Created successfully!")
-
-                # If excel_filename is generated, provide download link
-                if excel_filename:
-                    with open(excel_filename, 'rb') as f:
-                        st.download_button(
-                            label="Download Excel File",
-                            data=f,
-                            file_name=excel_filename,
-                            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-                        )
+        for ticker, (stock_data, _) in watchlist.items():
+            display_ticker(ticker, stock_data, last_prices[ticker], start_date, end_date)